@@ -6,20 +6,53 @@ SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
-from src.ui import run_textual_app
-
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="Caro console game (Textual UI)")
     parser.add_argument('--size', type=int, default=10, help='Board size (default: 10)')
     parser.add_argument('--win', type=int, default=5, help='Win condition (default: 5)')
     parser.add_argument('--difficulty', choices=['easy', 'medium', 'hard'], default='medium', help='AI difficulty')
+    parser.add_argument('--cache', metavar='PATH', default=None,
+                        help='Persistent analysis cache file shared across sessions (default: disabled)')
+    parser.add_argument('--weights', metavar='PATH', default=None,
+                        help='Evaluation weights file (default: weights.json in the repo if present)')
+    parser.add_argument('--headless', type=int, metavar='GAMES', default=0,
+                        help='Play GAMES AI-vs-AI games without the UI and print the results')
+    parser.add_argument('--record', metavar='PATH', default=None,
+                        help='With --headless: append finished games to a JSONL archive for tuning')
+    parser.add_argument('--profile', metavar='PATH', default=None,
+                        help='Profile the run and write the result to PATH')
+    parser.add_argument('--profile-mode', choices=['cpu', 'memory'], default='cpu',
+                        help='cpu: cProfile stats (+ PATH.txt summary), memory: tracemalloc top allocations')
     args = parser.parse_args()
     size = args.size
     win_condition = args.win
     difficulty = args.difficulty
 
-    run_textual_app(size=size, win_condition=win_condition, difficulty=difficulty)
+    from src.profiling import ProfileSession
+    profiler = ProfileSession(args.profile, args.profile_mode) if args.profile else None
+
+    if args.headless:
+        from src.headless import run_headless
+        from src.cache import AnalysisCache
+        from src.ai import evaluator_version, load_weights
+        weights = load_weights(args.weights)
+        cache = AnalysisCache(args.cache, evaluator_version=evaluator_version(weights)) if args.cache else None
+        if profiler:
+            profiler.start()
+        try:
+            run_headless(size=size, win_condition=win_condition, difficulty=difficulty,
+                         games=args.headless, cache=cache, weights=weights, record=args.record)
+        finally:
+            if profiler:
+                profiler.stop()
+            if cache is not None:
+                cache.close()
+        return
+
+    from src.ui import run_textual_app
+    run_textual_app(size=size, win_condition=win_condition, difficulty=difficulty,
+                    cache_path=args.cache, profiler=profiler, weights_path=args.weights)
 
 
 if __name__ == "__main__":
@@ -1,17 +1,64 @@
 # AI logic for Caro game: minimax, heuristic, transposition table
+import json
+import os
 import random
 import time
+import zlib
+
+from .cache import EXACT, LOWER, UPPER
+from .symmetry import from_canonical, to_canonical
+
+# Bump whenever evaluate() changes so persistent caches are invalidated
+EVALUATOR_VERSION = 1
+
+# Pattern weights for evaluate(): a run of win_condition or more, then open
+# runs of win_condition-1 .. win_condition-4
+DEFAULT_WEIGHTS = (100000, 10000, 1000, 100, 10)
+# Fitted weights written by `python -m src.tuning fit`, loaded when present
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'weights.json')
+
+
+def load_weights(path=None):
+    # Explicit paths must exist; the default file is optional
+    if path is None:
+        if not os.path.exists(WEIGHTS_PATH):
+            return DEFAULT_WEIGHTS
+        path = WEIGHTS_PATH
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    weights = tuple(int(w) for w in data['weights'])
+    if len(weights) != len(DEFAULT_WEIGHTS):
+        raise ValueError(f"Expected {len(DEFAULT_WEIGHTS)} weights in {path}, got {len(weights)}")
+    return weights
+
+
+def evaluator_version(weights=DEFAULT_WEIGHTS):
+    # Persistent cache tag: changes with the evaluator code and its weights
+    return zlib.crc32(f"{EVALUATOR_VERSION}:{tuple(weights)}".encode())
+
 
 class CaroAI:
-    def __init__(self, player='O', opponent='X', depth=2, time_limit=2.0):
+    def __init__(self, player='O', opponent='X', depth=2, time_limit=2.0, symmetry=False, cache=None,
+                 weights=None):
         self.player = player
         self.opponent = opponent
         self.depth = depth
         self.time_limit = time_limit
+        # When enabled, rotated/reflected positions share transposition entries
+        self.symmetry = symmetry
         self.transposition = {}
+        # Optional AnalysisCache shared across games and processes
+        self.cache = cache
+        self._salts = {}
+        self._timed_out = False
+        self._stop = None
+        self.nodes = 0
+        self.weights = tuple(weights) if weights is not None else load_weights()
 
     def evaluate(self, board, win_condition):
         # Heuristic: count open-ended sequences for both players
+        w_win, w_open4, w_open3, w_open2, w_open1 = self.weights
+
         def count_sequences(player):
             score = 0
             directions = [(0,1), (1,0), (1,1), (1,-1)]
@@ -38,28 +85,41 @@ class CaroAI:
                                     break
                                 k += 1
                         if count >= win_condition:
-                            score += 100000
+                            score += w_win
                         elif count == win_condition-1 and open_ends == 2:
-                            score += 10000
+                            score += w_open4
                         elif count == win_condition-2 and open_ends == 2:
-                            score += 1000
+                            score += w_open3
                         elif count == win_condition-3 and open_ends == 2:
-                            score += 100
+                            score += w_open2
                         elif count == win_condition-4 and open_ends == 2:
-                            score += 10
+                            score += w_open1
             return score
         return count_sequences(self.player) - count_sequences(self.opponent)
 
     def minimax(self, board, win_condition, depth, alpha, beta, maximizing, start_time):
-        key = tuple(tuple(row) for row in board.grid)
-        if key in self.transposition:
-            return self.transposition[key]
+        self.nodes += 1
+        key, sym = self.position_key(board)
+        entry = self.transposition.get(key)
+        if entry is not None and entry[0] >= depth and self._bound_allows(entry[1], entry[2], alpha, beta):
+            return entry[1], from_canonical(entry[3], sym, board.size)
         if board.check_win(self.player):
             return 100000, None
         if board.check_win(self.opponent):
             return -100000, None
-        if board.is_full() or depth == 0 or (time.time() - start_time) > self.time_limit:
+        if board.is_full() or depth == 0:
+            return self.evaluate(board, win_condition), None
+        if (time.time() - start_time) > self.time_limit or (self._stop is not None and self._stop.is_set()):
+            # Results above this node are no longer full-depth; keep them
+            # out of the persistent cache
+            self._timed_out = True
             return self.evaluate(board, win_condition), None
+        if self.cache is not None:
+            cache_key, cache_sym = self.cache_key(board, win_condition, maximizing)
+            hit = self._probe_cache(board, cache_key, cache_sym, depth, alpha, beta)
+            if hit is not None:
+                return hit
+        alpha_orig, beta_orig = alpha, beta
         moves = self.smart_moves(board)
         best_move = None
         if maximizing:
@@ -74,8 +134,7 @@ class CaroAI:
                 alpha = max(alpha, eval)
                 if beta <= alpha:
                     break
-            self.transposition[key] = (max_eval, best_move)
-            return max_eval, best_move
+            best_eval = max_eval
         else:
             min_eval = float('inf')
             for move in moves:
@@ -88,8 +147,56 @@ class CaroAI:
                 beta = min(beta, eval)
                 if beta <= alpha:
                     break
-            self.transposition[key] = (min_eval, best_move)
-            return min_eval, best_move
+            best_eval = min_eval
+        # Fail-low/fail-high results only bound the true value
+        if best_eval <= alpha_orig:
+            bound = UPPER
+        elif best_eval >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.transposition[key] = (depth, best_eval, bound, to_canonical(best_move, sym, board.size))
+        if self.cache is not None and not self._timed_out:
+            self.cache.store(cache_key, depth, best_eval, bound,
+                             to_canonical(best_move, cache_sym, board.size))
+        return best_eval, best_move
+
+    def _probe_cache(self, board, cache_key, cache_sym, depth, alpha, beta):
+        entry = self.cache.probe(cache_key)
+        if entry is None:
+            return None
+        c_depth, score, bound, move = entry
+        if c_depth < depth:
+            return None
+        move = from_canonical(move, cache_sym, board.size)
+        if move is None or not board.is_valid_move(*move):
+            return None
+        if self._bound_allows(score, bound, alpha, beta):
+            return score, move
+        return None
+
+    @staticmethod
+    def _bound_allows(score, bound, alpha, beta):
+        # A stored score can replace a search of the (alpha, beta) window only
+        # if it is exact or the bound already causes the same cutoff
+        return bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha)
+
+    def cache_key(self, board, win_condition, maximizing):
+        # Persistent entries are always symmetry-canonical and salted with the
+        # search context, since scores depend on who is maximizing
+        key, sym = board.canonical_key()
+        salt = self._salts.get((win_condition, maximizing))
+        if salt is None:
+            salt = random.Random(f"karo-cache:{win_condition}:{self.player}:{maximizing}").getrandbits(64)
+            self._salts[(win_condition, maximizing)] = salt
+        return key ^ salt, sym
+
+    def position_key(self, board):
+        # Returns (key, symmetry); cached moves are stored in the orientation
+        # given by the symmetry and must be mapped back with from_canonical
+        if self.symmetry:
+            return board.canonical_key()
+        return tuple(tuple(row) for row in board.grid), 0
 
     def smart_moves(self, board):
         # Only consider moves within 2 cells of existing pieces
@@ -106,7 +213,134 @@ class CaroAI:
             return board.get_valid_moves()
         return list(moves)
 
-    def get_move(self, board, win_condition, difficulty='medium'):
+    def search(self, board, win_condition, max_depth, top_n=1, on_update=None, stop=None, start_depth=1):
+        """Iterative deepening from ``board`` with ``self.player`` to move.
+
+        Returns a dict with the deepest completed iteration: ``depth``,
+        ``move``, ``score``, ``pv`` and the ``top_n`` best root ``candidates``
+        as (move, score) pairs, plus ``nodes``, ``elapsed`` and ``complete``.
+        ``on_update`` is called from the searching thread with the same dict
+        after every root move, so callers can show progress for free; while
+        a new iteration has fewer than ``top_n`` candidates the previous
+        iteration's result is repeated. Setting the ``stop`` event ends the
+        search early, as does the time limit.
+        A timed-out iteration is discarded unless it is the first one, whose
+        unsearched root moves are still checked for a win or a forced block.
+        """
+        self.transposition = {}
+        self._timed_out = False
+        self._stop = stop
+        self.nodes = 0
+        start_time = time.time()
+        moves = self.smart_moves(board)
+        result = None
+        if self.cache is not None and top_n == 1:
+            cache_key, cache_sym = self.cache_key(board, win_condition, True)
+            hit = self._probe_cache(board, cache_key, cache_sym, max_depth, -float('inf'), float('inf'))
+            if hit is not None:
+                score, move = hit
+                return self._search_info(board, max_depth, [(move, score)], start_time, True)
+        for depth in range(min(start_depth, max_depth), max_depth + 1):
+            scored = []
+            alpha = -float('inf')
+            for move in moves:
+                board.make_move(*move, self.player)
+                score, _ = self.minimax(board, win_condition, depth-1, alpha, float('inf'), False, start_time)
+                board.undo_move(*move)
+                if self._timed_out and (result is not None or scored):
+                    if result is None and not (stop is not None and stop.is_set()):
+                        scored = self._settle_root(board, win_condition, scored, moves)
+                    break
+                scored.append((move, score))
+                scored.sort(key=lambda ms: ms[1], reverse=True)
+                if len(scored) >= top_n:
+                    # Moves at or below the N-th best only get an upper bound
+                    alpha = scored[top_n-1][1]
+                if on_update is not None:
+                    on_update(self._partial_info(board, depth, scored, top_n, result, start_time))
+            if self._timed_out and result is not None:
+                break
+            # Search the best moves of this iteration first in the next one
+            moves = [m for m, _ in scored] + moves[len(scored):]
+            result = self._search_info(board, depth, scored[:top_n], start_time, not self._timed_out)
+            if self.cache is not None and not self._timed_out:
+                cache_key, cache_sym = self.cache_key(board, win_condition, True)
+                self.cache.store(cache_key, depth, result['score'], EXACT,
+                                 to_canonical(result['move'], cache_sym, board.size))
+            if on_update is not None:
+                on_update(result)
+            if self._timed_out:
+                break
+        return result
+
+    def _settle_root(self, board, win_condition, scored, moves):
+        # Out of time before any iteration completed: the unsearched root
+        # moves get no score, but a move that wins must still be played and
+        # an opponent's win on the next move must still be blocked
+        threats = set()
+        for move in moves:
+            board.make_move(*move, self.opponent)
+            if board.check_win(self.opponent):
+                threats.add(move)
+            board.undo_move(*move)
+        scores = dict(scored)
+        settled = []
+        for move in moves:
+            score = scores.get(move)
+            board.make_move(*move, self.player)
+            if board.check_win(self.player):
+                score = 100000
+            elif threats and move not in threats:
+                score = -100000
+            elif score is None and threats:
+                score = self.evaluate(board, win_condition)
+            board.undo_move(*move)
+            if score is not None:
+                settled.append((move, score))
+        settled.sort(key=lambda ms: ms[1], reverse=True)
+        return settled
+
+    def _partial_info(self, board, depth, scored, top_n, result, start_time):
+        # Until the running iteration has top_n candidates, keep reporting the
+        # last completed one so hints do not shrink at every new depth
+        if result is not None and len(scored) < top_n:
+            return dict(result, nodes=self.nodes, elapsed=time.time() - start_time)
+        partial = self._search_info(board, depth, scored[:top_n], start_time, False, pv=False)
+        if result is not None and result['pv'] and result['pv'][0] == partial['move']:
+            partial['pv'] = result['pv']
+        elif partial['move'] is not None:
+            partial['pv'] = [partial['move']]
+        return partial
+
+    def _search_info(self, board, depth, candidates, start_time, complete, pv=True):
+        move, score = candidates[0] if candidates else (None, 0)
+        return {
+            'player': self.player,
+            'depth': depth,
+            'move': move,
+            'score': score,
+            'pv': self.principal_variation(board, move, depth) if pv and move is not None else [],
+            'candidates': list(candidates),
+            'nodes': self.nodes,
+            'elapsed': time.time() - start_time,
+            'complete': complete,
+        }
+
+    def principal_variation(self, board, move, max_len):
+        # Follow best moves stored in the transposition table from ``move``
+        pv = []
+        player, other = self.player, self.opponent
+        while move is not None and len(pv) < max_len and board.make_move(*move, player):
+            pv.append(move)
+            player, other = other, player
+            key, sym = self.position_key(board)
+            entry = self.transposition.get(key)
+            move = from_canonical(entry[3], sym, board.size) if entry is not None else None
+        for m in reversed(pv):
+            board.undo_move(*m)
+        return pv
+
+    def get_move(self, board, win_condition, difficulty='medium', on_update=None):
         if difficulty == 'easy':
             return random.choice(board.get_valid_moves())
         elif difficulty == 'hard':
@@ -115,9 +349,8 @@ class CaroAI:
         else:
             self.depth = 2
             self.time_limit = 1.0
-        self.transposition = {}
-        start_time = time.time()
-        _, move = self.minimax(board, win_condition, self.depth, -float('inf'), float('inf'), True, start_time)
+        result = self.search(board, win_condition, self.depth, on_update=on_update, start_depth=self.depth)
+        move = result['move'] if result is not None else None
         if move is None:
             move = random.choice(board.get_valid_moves())
         return move
@@ -0,0 +1,185 @@
+# Micro-benchmarks for the engine hot paths, with JSON baselines
+#
+#   python -m src.bench                          # run and print
+#   python -m src.bench --save bench.json        # record a baseline
+#   python -m src.bench --compare bench.json     # flag regressions (exit 1)
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+import tracemalloc
+
+from .board import Board
+from .ai import CaroAI, DEFAULT_WEIGHTS
+from .profiling import PROFILE_MODES, ProfileSession
+
+SIZES = (10, 15, 19)
+# Search depth of the get_move benchmark (the 'medium' difficulty depth)
+SEARCH_DEPTH = 2
+# Stones placed for the fixed position on each board size
+STONES = {10: 12, 15: 20, 19: 30}
+DEFAULT_THRESHOLD = 0.10
+
+
+def fixed_position(size, win_condition=5, stones=None, seed=0):
+    # Deterministic mid-game position: alternating stones near the centre,
+    # skipping any placement that would end the game
+    stones = STONES.get(size, size) if stones is None else stones
+    rng = random.Random(f"karo-bench:{size}:{seed}")
+    board = Board(size, win_condition)
+    lo, hi = size // 4, size - 1 - size // 4
+    player = 'X'
+    placed = 0
+    while placed < stones:
+        row, col = rng.randint(lo, hi), rng.randint(lo, hi)
+        if not board.make_move(row, col, player):
+            continue
+        if board.check_win(player):
+            board.undo_move(row, col)
+            continue
+        player = 'O' if player == 'X' else 'X'
+        placed += 1
+    board.winning_sequence = []
+    return board
+
+
+def hot_paths(size, win_condition=5):
+    """Return (name, callable) pairs timing the engine hot paths on one size."""
+    board = fixed_position(size, win_condition)
+    # Fixed weights: a tuned weights.json must not change what is measured
+    ai = CaroAI(player='O', opponent='X', weights=DEFAULT_WEIGHTS)
+    move = next(iter(ai.smart_moves(board)))
+
+    def make_undo():
+        board.make_move(move[0], move[1], 'O')
+        board.undo_move(move[0], move[1])
+
+    # get_move() caps each call with its difficulty's time limit, which would
+    # hide slowdowns; time the same search at a fixed depth instead
+    search_ai = CaroAI(player='O', opponent='X', time_limit=float('inf'), weights=DEFAULT_WEIGHTS)
+
+    def get_move():
+        return search_ai.search(board, win_condition, SEARCH_DEPTH, start_depth=SEARCH_DEPTH)
+
+    prefix = f"{size}x{size}/"
+    return [
+        (prefix + "check_win", lambda: board.check_win('X')),
+        (prefix + "get_valid_moves", board.get_valid_moves),
+        (prefix + "smart_moves", lambda: ai.smart_moves(board)),
+        (prefix + "evaluate", lambda: ai.evaluate(board, win_condition)),
+        (prefix + "make_move+undo_move", make_undo),
+        (prefix + f"get_move(depth={SEARCH_DEPTH})", get_move),
+    ]
+
+
+def measure(func, repeat=3, min_time=0.2):
+    timer = timeit.Timer(func)
+    number, _ = _autorange(timer, min_time)
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    # Peak traced memory of one call; leave tracing on if a memory profile
+    # session already started it
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        peak -= base
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return {"ops_per_sec": 1.0 / best if best > 0 else float('inf'), "peak_bytes": peak}
+
+
+def _autorange(timer, min_time):
+    # Like Timer.autorange() but with a configurable target time
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            return number, elapsed
+        number *= 10 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+
+def run(sizes=SIZES, win_condition=5, repeat=3, min_time=0.2, select=None, out=print):
+    results = {}
+    for size in sizes:
+        for name, func in hot_paths(size, win_condition):
+            if select and not any(s in name for s in select):
+                continue
+            results[name] = measure(func, repeat=repeat, min_time=min_time)
+            r = results[name]
+            out(f"{name:<28} {r['ops_per_sec']:>14,.1f} ops/s {r['peak_bytes']:>12,} B peak")
+    return results
+
+
+def save_baseline(path, results):
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "weights": list(DEFAULT_WEIGHTS),
+        "results": results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return [(name, baseline ops/s, current ops/s, change)] for regressions."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("ops_per_sec"):
+            continue
+        change = current["ops_per_sec"] / base["ops_per_sec"] - 1.0
+        if change < -threshold:
+            regressions.append((name, base["ops_per_sec"], current["ops_per_sec"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Caro engine hot paths")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='Board sizes (default: 10 15 19)')
+    parser.add_argument('--win', type=int, default=5, help='Win condition (default: 5)')
+    parser.add_argument('--select', nargs='+', default=None, help='Only run benchmarks whose name contains one of these')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repeats, best is kept (default: 3)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per timing run (default: 0.2)')
+    parser.add_argument('--save', metavar='PATH', help='Write results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='Compare against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Slowdown fraction reported as a regression (default: 0.10)')
+    parser.add_argument('--profile', metavar='PATH', help='Profile the benchmark run to this file')
+    parser.add_argument('--profile-mode', choices=PROFILE_MODES, default='cpu', help='Profiler (default: cpu)')
+    args = parser.parse_args(argv)
+
+    profiler = ProfileSession(args.profile, args.profile_mode) if args.profile else None
+    if profiler:
+        profiler.start()
+    try:
+        results = run(args.sizes, args.win, args.repeat, args.min_time, args.select)
+    finally:
+        if profiler:
+            profiler.stop()
+
+    if args.save:
+        save_baseline(args.save, results)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("weights", list(DEFAULT_WEIGHTS)) != list(DEFAULT_WEIGHTS):
+            print(f"warning: baseline used weights {baseline['weights']}, now {list(DEFAULT_WEIGHTS)}")
+        regressions = compare(results, baseline, args.threshold)
+        for name, base, current, change in regressions:
+            print(f"REGRESSION {name}: {base:,.1f} -> {current:,.1f} ops/s ({change:+.1%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
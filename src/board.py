@@ -1,4 +1,5 @@
 # Board representation and logic for Caro game
+from .symmetry import unpack_hashes, zobrist_table
 
 class Board:
     def __init__(self, size=10, win_condition=5):
@@ -8,11 +9,25 @@ class Board:
         self.grid = [[self.EMPTY for _ in range(size)] for _ in range(size)]
         self.last_move = None
         self.winning_sequence = []
+        # Zobrist hashes of the position under each of the 8 board symmetries,
+        # packed 64 bits each into one integer (see SymmetryZobrist)
+        self._zobrist = zobrist_table(size)
+        self.hash = 0
 
     def reset(self):
         self.grid = [[self.EMPTY for _ in range(self.size)] for _ in range(self.size)]
         self.last_move = None
         self.winning_sequence = []
+        self.hash = 0
+
+    def copy(self):
+        other = Board(self.size, self.win_condition)
+        other.EMPTY = self.EMPTY
+        other.grid = [row[:] for row in self.grid]
+        other.last_move = self.last_move
+        other.winning_sequence = list(self.winning_sequence)
+        other.hash = self.hash
+        return other
 
     def is_valid_move(self, row, col):
         return 0 <= row < self.size and 0 <= col < self.size and self.grid[row][col] == self.EMPTY
@@ -21,13 +36,28 @@ class Board:
         if self.is_valid_move(row, col):
             self.grid[row][col] = player
             self.last_move = (row, col)
+            self.hash ^= self._zobrist[player][row * self.size + col]
             return True
         return False
 
     def undo_move(self, row, col):
+        player = self.grid[row][col]
+        if player != self.EMPTY:
+            self.hash ^= self._zobrist[player][row * self.size + col]
         self.grid[row][col] = self.EMPTY
         self.last_move = None
 
+    @property
+    def hashes(self):
+        return unpack_hashes(self.hash)
+
+    def canonical_key(self):
+        # Smallest of the 8 symmetric hashes and the symmetry that produces it;
+        # symmetric positions share the same key
+        hashes = unpack_hashes(self.hash)
+        key = min(hashes)
+        return key, hashes.index(key)
+
     def get_valid_moves(self):
         moves = []
         for i in range(self.size):
@@ -0,0 +1,161 @@
+# Persistent analysis cache: fixed-size memory-mapped table of search results
+import mmap
+import os
+import struct
+
+try:  # POSIX only; used to serialize file creation between processes
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+EXACT, LOWER, UPPER = 1, 2, 3
+
+MAGIC = b"KAROTT\x00\x00"
+FORMAT_VERSION = 1
+# magic, format version, evaluator version, bucket count; padded to 64 bytes
+HEADER = struct.Struct("<8sIIQ")
+HEADER_SIZE = 64
+# check word (key ^ data) and packed data word
+ENTRY = struct.Struct("<QQ")
+SLOTS_PER_BUCKET = 2
+BUCKET_SIZE = ENTRY.size * SLOTS_PER_BUCKET
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_NO_MOVE = 0xFF
+
+
+def _pack(depth, score, bound, move):
+    score = max(-0x7FFFFFFF, min(0x7FFFFFFF, int(score)))
+    row, col = move if move is not None else (_NO_MOVE, _NO_MOVE)
+    return (score & 0xFFFFFFFF) | (depth & 0xFF) << 32 | bound << 40 | row << 48 | col << 56
+
+
+def _unpack(data):
+    score = data & 0xFFFFFFFF
+    if score >= 0x80000000:
+        score -= 0x100000000
+    depth = (data >> 32) & 0xFF
+    bound = (data >> 40) & 0xFF
+    row = (data >> 48) & 0xFF
+    col = (data >> 56) & 0xFF
+    move = None if row == _NO_MOVE else (row, col)
+    return depth, score, bound, move
+
+
+class AnalysisCache:
+    """Position hash -> (depth, score, bound, best move), shared through a file.
+
+    The file is a versioned header followed by buckets of two 16-byte slots:
+    slot 0 keeps the deepest result seen, slot 1 always takes the newest.
+    Slots are written without locks; each stores ``key ^ data`` next to
+    ``data`` so a torn write from a concurrent process fails the check and
+    reads as a miss. Opening a file whose header does not match the format or
+    ``evaluator_version`` clears it in place, keeping its size. Only new or
+    empty files are turned into a cache; any other file raises ValueError.
+    """
+
+    def __init__(self, path, evaluator_version=0, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.evaluator_version = evaluator_version
+        self._file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                self.buckets = self._prepare(max_bytes)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._mm = mmap.mmap(self._file.fileno(), HEADER_SIZE + self.buckets * BUCKET_SIZE)
+        except BaseException:
+            self._file.close()
+            raise
+        self._tag = self._mm[:16]
+
+    def _prepare(self, max_bytes):
+        f = self._file
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        if file_size > 0:
+            f.seek(0)
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} exists and is not an analysis cache file")
+        if file_size >= HEADER_SIZE:
+            f.seek(0)
+            magic, fmt, evaluator, buckets = HEADER.unpack(f.read(HEADER.size))
+            expected = HEADER_SIZE + buckets * BUCKET_SIZE
+            if buckets > 0 and file_size >= expected:
+                if fmt != FORMAT_VERSION or evaluator != self.evaluator_version:
+                    # Stale results: wipe entries but never shrink a file
+                    # other processes may still have mapped
+                    self._write_empty(buckets)
+                return buckets
+        # New file, or a cache whose creation was interrupted
+        buckets = max(1, (max_bytes - HEADER_SIZE) // BUCKET_SIZE)
+        f.truncate(0)
+        self._write_empty(buckets)
+        return buckets
+
+    def _write_empty(self, buckets):
+        # Header first: other processes see the new tag and stop using their
+        # entries, and an interrupted write still leaves a recognisable cache
+        f = self._file
+        f.seek(0)
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.evaluator_version, buckets)
+        f.write(header.ljust(HEADER_SIZE, b"\x00"))
+        chunk = bytes(BUCKET_SIZE * 4096)
+        remaining = buckets * BUCKET_SIZE
+        while remaining > 0:
+            n = min(remaining, len(chunk))
+            f.write(chunk[:n])
+            remaining -= n
+        f.flush()
+
+    def _current(self):
+        # Another process may have reset the file for a different evaluator
+        return self._mm[:16] == self._tag
+
+    def probe(self, key):
+        """Return (depth, score, bound, move) for ``key`` or None."""
+        if not self._current():
+            return None
+        base = HEADER_SIZE + (key % self.buckets) * BUCKET_SIZE
+        for slot in range(SLOTS_PER_BUCKET):
+            check, data = ENTRY.unpack_from(self._mm, base + slot * ENTRY.size)
+            if data and check ^ data == key:
+                return _unpack(data)
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        if not self._current():
+            return
+        base = HEADER_SIZE + (key % self.buckets) * BUCKET_SIZE
+        data = _pack(depth, score, bound, move)
+        check, old = ENTRY.unpack_from(self._mm, base)
+        old_key = check ^ old
+        if not old or old_key == key or depth >= _unpack(old)[0]:
+            if old and old_key != key:
+                # Demote the previous deep entry to the always-replace slot
+                ENTRY.pack_into(self._mm, base + ENTRY.size, check, old)
+            ENTRY.pack_into(self._mm, base, key ^ data, data)
+        else:
+            ENTRY.pack_into(self._mm, base + ENTRY.size, key ^ data, data)
+
+    def clear(self):
+        self._mm[HEADER_SIZE:] = bytes(len(self._mm) - HEADER_SIZE)
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,57 @@
+# Headless AI-vs-AI games, for batch runs and profiling without the Textual UI
+import json
+import random
+import time
+
+from .game import Game
+from .ai import CaroAI
+
+
+def play_game(size=10, win_condition=5, difficulty='medium', ais=None, opening=0, rng=None):
+    game = Game(size=size, win_condition=win_condition)
+    if ais is None:
+        ais = {'X': CaroAI(player='X', opponent='O', symmetry=True),
+               'O': CaroAI(player='O', opponent='X', symmetry=True)}
+    # Random stones near the centre so that repeated games differ
+    rng = rng or random.Random()
+    lo, hi = max(0, size // 2 - 2), min(size - 1, size // 2 + 2)
+    while game.move_count < opening and not game.finished:
+        game.make_move(rng.randint(lo, hi), rng.randint(lo, hi))
+    while not game.finished:
+        row, col = ais[game.current_player].get_move(game.board, win_condition, difficulty)
+        game.make_move(row, col)
+    return game
+
+
+def game_record(game):
+    # One archive line: the format read by src.tuning
+    return {
+        'size': game.size,
+        'win': game.win_condition,
+        'moves': [[row, col, player] for row, col, player in game.move_history],
+        'winner': game.winner,
+    }
+
+
+def run_headless(size=10, win_condition=5, difficulty='medium', games=1, cache=None,
+                 opening=2, seed=None, weights=None, record=None, out=print):
+    rng = random.Random(seed)
+    ais = {'X': CaroAI(player='X', opponent='O', symmetry=True, cache=cache, weights=weights),
+           'O': CaroAI(player='O', opponent='X', symmetry=True, cache=cache, weights=weights)}
+    results = {'X': 0, 'O': 0, None: 0}
+    archive = open(record, 'a', encoding='utf-8') if record else None
+    try:
+        for i in range(games):
+            t0 = time.perf_counter()
+            game = play_game(size, win_condition, difficulty, ais, opening, rng)
+            results[game.winner] += 1
+            if archive is not None:
+                archive.write(json.dumps(game_record(game)) + '\n')
+                archive.flush()
+            out(f"Game {i + 1}: winner={game.winner or 'draw'} moves={game.move_count} "
+                f"time={time.perf_counter() - t0:.2f}s")
+    finally:
+        if archive is not None:
+            archive.close()
+    out(f"X: {results['X']}  O: {results['O']}  draws: {results[None]}")
+    return results
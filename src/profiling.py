@@ -0,0 +1,77 @@
+# Profiling hooks: cProfile (cpu) or tracemalloc (memory), written to a file
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+
+PROFILE_MODES = ('cpu', 'memory')
+
+
+class ProfileSession:
+    """Profile a run of the app and write the result to ``path`` on stop().
+
+    ``cpu`` writes a pstats dump to ``path`` (open with ``python -m pstats``
+    or snakeviz) and a text summary to ``path + '.txt'``. ``memory`` writes
+    the top allocation sites from tracemalloc as text.
+
+    Work done in worker threads should go through call(): before Python 3.12
+    cProfile only sees the thread that enabled it, so those calls get their
+    own profiler and are merged into the output.
+    """
+
+    def __init__(self, path, mode='cpu', top=40):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.top = top
+        self._profile = None
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.mode == 'cpu':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            tracemalloc.start(25)
+
+    def call(self, func, *args, **kwargs):
+        if self.mode != 'cpu' or sys.version_info >= (3, 12) or self._profile is None:
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._thread_profiles.append(profile)
+
+    def stop(self):
+        if self.mode == 'cpu':
+            self._profile.disable()
+            stats = pstats.Stats(self._profile)
+            for profile in self._thread_profiles:
+                stats.add(profile)
+            stats.dump_stats(self.path)
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(self.top)
+            with open(self.path + '.txt', 'w', encoding='utf-8') as f:
+                f.write(out.getvalue())
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(f"current: {current} B, peak: {peak} B\n\n")
+                for stat in snapshot.statistics('lineno')[:self.top]:
+                    f.write(f"{stat}\n")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,97 @@
+# Dihedral symmetries of a square board and symmetry-aware Zobrist hashing
+import random
+
+# The 8 symmetries of a square, as index -> (row, col) mapping on an n x n board:
+# 0 identity, 1 rot90, 2 rot180, 3 rot270,
+# 4 mirror left-right, 5 mirror top-bottom, 6 transpose, 7 anti-transpose
+SYMMETRY_COUNT = 8
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+HASH_MASK = (1 << 64) - 1
+
+
+def transform(row, col, sym, size):
+    m = size - 1
+    if sym == 0:
+        return row, col
+    if sym == 1:
+        return col, m - row
+    if sym == 2:
+        return m - row, m - col
+    if sym == 3:
+        return m - col, row
+    if sym == 4:
+        return row, m - col
+    if sym == 5:
+        return m - row, col
+    if sym == 6:
+        return col, row
+    return m - col, m - row
+
+
+def to_canonical(move, sym, size):
+    # Map a move on the real board into the canonical orientation
+    if move is None:
+        return None
+    return transform(move[0], move[1], sym, size)
+
+
+def from_canonical(move, sym, size):
+    # Map a move stored in canonical orientation back onto the real board
+    if move is None:
+        return None
+    return transform(move[0], move[1], INVERSE[sym], size)
+
+
+class SymmetryZobrist(dict):
+    """Zobrist keys that update the hashes of all 8 board orientations at once.
+
+    The 8 hashes are packed into one integer, 64 bits per symmetry, so a move
+    updates all of them with a single XOR. ``zobrist[player][row * size + col]``
+    is the packed key whose k-th word is the key of the transformed cell
+    ``transform(row, col, k)``, which keeps word k equal to the hash of the
+    k-th transformed board. Keys are seeded from the board size and player so
+    they are identical across processes.
+    """
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def __missing__(self, player):
+        # Tables are built on first use by each player
+        table = self[player] = self._build(player)
+        return table
+
+    def keys(self, row, col, player):
+        # The 8 per-symmetry keys of one cell, unpacked
+        return unpack_hashes(self[player][row * self.size + col])
+
+    def _build(self, player):
+        n = self.size
+        rng = random.Random(f"karo-zobrist:{n}:{player}")
+        base = [rng.getrandbits(64) for _ in range(n * n)]
+        table = []
+        for r in range(n):
+            for c in range(n):
+                packed = 0
+                for sym in range(SYMMETRY_COUNT):
+                    tr, tc = transform(r, c, sym, n)
+                    packed |= base[tr * n + tc] << (64 * sym)
+                table.append(packed)
+        return table
+
+
+def unpack_hashes(packed):
+    # Split a packed hash into the 8 per-symmetry 64-bit words
+    return [(packed >> (64 * sym)) & HASH_MASK for sym in range(SYMMETRY_COUNT)]
+
+
+_tables = {}
+
+
+def zobrist_table(size):
+    table = _tables.get(size)
+    if table is None:
+        table = SymmetryZobrist(size)
+        _tables[size] = table
+    return table
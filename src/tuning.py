@@ -0,0 +1,276 @@
+# Texel-style tuning of the evaluate() pattern weights over game archives
+#
+#   python main.py --headless 500 --record games.jsonl      # build an archive
+#   python -m src.tuning extract games.jsonl --out features/
+#   python -m src.tuning fit features/ --out weights.json
+#
+# Archives are JSONL, one finished game per line:
+#   {"size": 15, "win": 5, "moves": [[r, c, "X"], [r, c, "O"], ...], "winner": "X" | "O" | null}
+# Moves may omit the player, in which case X moves first and turns alternate.
+#
+# Requires NumPy (`uv sync --extra tune` or `pip install numpy`).
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .ai import DEFAULT_WEIGHTS
+
+EMPTY, X, O = 0, 1, 2
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+PATTERNS = len(DEFAULT_WEIGHTS)
+DEFAULT_CHUNK = 16384
+
+
+def _shift(a, dr, dc):
+    # out[:, i, j] = a[:, i + dr, j + dc], zero/False outside the board
+    n = a.shape[1]
+    out = np.zeros_like(a)
+    rows_dst = slice(max(0, -dr), n - max(0, dr))
+    rows_src = slice(max(0, dr), n - max(0, -dr))
+    cols_dst = slice(max(0, -dc), n - max(0, dc))
+    cols_src = slice(max(0, dc), n - max(0, -dc))
+    out[:, rows_dst, cols_dst] = a[:, rows_src, cols_src]
+    return out
+
+
+def pattern_counts(boards, player, win_condition):
+    """Count evaluate()'s patterns for ``player`` on a (B, n, n) int8 batch.
+
+    Returns (B, PATTERNS) int32 counts in DEFAULT_WEIGHTS order, counted per
+    stone and direction exactly like CaroAI.evaluate, so that
+    ``counts @ weights`` equals its score for that player.
+    """
+    mask = boards == player
+    empty = boards == EMPTY
+    stones = mask.astype(np.int8)
+    counts = np.zeros((boards.shape[0], PATTERNS), dtype=np.int32)
+    for dr, dc in DIRECTIONS:
+        runs, opens = [], []
+        for sr, sc in ((dr, dc), (-dr, -dc)):
+            next_stone = _shift(mask, sr, sc)
+            next_empty = _shift(empty, sr, sc)
+            # Run length from each stone in this direction (itself included)
+            # and whether the cell after the run is empty. Runs are exact up
+            # to win_condition, which is all the patterns need.
+            run = stones.copy()
+            open_end = mask & next_empty
+            for _ in range(win_condition - 1):
+                run = stones * (1 + _shift(run, sr, sc))
+                open_end = mask & np.where(next_stone, _shift(open_end, sr, sc), next_empty)
+            runs.append(run)
+            opens.append(open_end)
+        count = runs[0] + runs[1] - 1
+        both_open = opens[0] & opens[1]
+        counts[:, 0] += (mask & (count >= win_condition)).sum(axis=(1, 2))
+        for k in range(1, PATTERNS):
+            counts[:, k] += (both_open & (count == win_condition - k)).sum(axis=(1, 2))
+    return counts
+
+
+def extract_features(boards, labels, win_condition):
+    """Feature rows (O counts - X counts) for a batch, dropping decided positions."""
+    counts_o = pattern_counts(boards, O, win_condition)
+    counts_x = pattern_counts(boards, X, win_condition)
+    keep = (counts_o[:, 0] == 0) & (counts_x[:, 0] == 0)
+    features = (counts_o - counts_x)[keep].astype(np.int16)
+    return features, labels[keep]
+
+
+def iter_games(paths):
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def iter_batches(paths, chunk=DEFAULT_CHUNK, min_ply=4):
+    """Yield (win_condition, boards, labels) batches of at most ``chunk`` positions.
+
+    Labels are the game result for O: 2 win, 1 draw, 0 loss. Only one
+    partially filled batch per (size, win) is held at a time.
+    """
+    pending = {}
+    for game in iter_games(paths):
+        size, win = game['size'], game['win']
+        label = {'O': 2, None: 1, 'X': 0}[game.get('winner')]
+        boards, labels = pending.setdefault((size, win), ([], []))
+        grid = np.zeros((size, size), dtype=np.int8)
+        for ply, move in enumerate(game['moves']):
+            player = move[2] if len(move) > 2 else ('X' if ply % 2 == 0 else 'O')
+            grid[move[0], move[1]] = X if player == 'X' else O
+            if ply + 1 < min_ply:
+                continue
+            boards.append(grid.copy())
+            labels.append(label)
+            if len(boards) >= chunk:
+                yield win, np.stack(boards), np.array(labels, dtype=np.uint8)
+                boards.clear()
+                labels.clear()
+    for (size, win), (boards, labels) in pending.items():
+        if boards:
+            yield win, np.stack(boards), np.array(labels, dtype=np.uint8)
+
+
+def _extract_job(win_condition, boards, labels):
+    return extract_features(boards, labels, win_condition)
+
+
+def extract(paths, out_dir, chunk=DEFAULT_CHUNK, workers=None, min_ply=4, out=print):
+    """Stream archives into ``out_dir/chunk-NNNNN.npz`` files; returns the row count."""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    total = 0
+    index = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = []
+
+        def drain(limit):
+            nonlocal total, index
+            while len(in_flight) > limit:
+                features, labels = in_flight.pop(0).result()
+                np.savez(os.path.join(out_dir, f"chunk-{index:05d}.npz"), features=features, labels=labels)
+                index += 1
+                total += len(labels)
+                out(f"chunk {index}: {len(labels)} positions ({total} total)")
+
+        for win, boards, labels in iter_batches(paths, chunk, min_ply):
+            in_flight.append(pool.submit(_extract_job, win, boards, labels))
+            # Bound memory: at most two batches per worker are queued
+            drain(2 * workers)
+        drain(0)
+    return total
+
+
+def load_chunks(feature_dir):
+    """Load the compact feature chunks: [(features int16, labels uint8), ...]."""
+    chunks = []
+    for path in sorted(glob.glob(os.path.join(feature_dir, 'chunk-*.npz'))):
+        with np.load(path) as data:
+            chunks.append((data['features'], data['labels']))
+    if not chunks:
+        raise FileNotFoundError(f"No feature chunks in {feature_dir}")
+    return chunks
+
+
+def _newton_pass(chunk, design, u):
+    features, labels = chunk
+    x = design(features)
+    y = labels / 2.0
+    z = x @ u
+    p = 0.5 * (1.0 + np.tanh(0.5 * z))
+    loss = np.sum(np.logaddexp(0.0, z) - y * z)
+    grad = x.T @ (p - y)
+    hess = (x * (p * (1.0 - p))[:, None]).T @ x
+    return loss, grad, hess
+
+
+def _newton(chunks, design, u0, pool, l2=1e-6, iterations=50, tol=1e-9):
+    # Damped Newton / IRLS on the mean logistic loss; chunks run in parallel
+    # threads since NumPy releases the GIL in the heavy operations
+    rows = sum(len(labels) for _, labels in chunks)
+    prior = np.array(u0, dtype=np.float64)
+
+    def evaluate(u):
+        loss, grad, hess = 0.0, 0.0, 0.0
+        for part in pool.map(lambda c: _newton_pass(c, design, u), chunks):
+            loss += part[0]
+            grad = grad + part[1]
+            hess = hess + part[2]
+        diff = u - prior
+        return (loss / rows + l2 * diff @ diff,
+                grad / rows + 2 * l2 * diff,
+                hess / rows + 2 * l2 * np.eye(len(u)))
+
+    u = prior.copy()
+    loss, grad, hess = evaluate(u)
+    for _ in range(iterations):
+        step = np.linalg.solve(hess, grad)
+        scale = 1.0
+        while scale > 1e-6:
+            candidate = u - scale * step
+            c_loss, c_grad, c_hess = evaluate(candidate)
+            if c_loss <= loss:
+                break
+            scale *= 0.5
+        else:
+            break
+        done = loss - c_loss < tol
+        u, loss, grad, hess = candidate, c_loss, c_grad, c_hess
+        if done:
+            break
+    return u, loss
+
+
+def fit(chunks, weights=DEFAULT_WEIGHTS, workers=None, l2=1e-6):
+    """Fit pattern weights to game results.
+
+    First the sigmoid scale K is fitted so that sigmoid(K * score) with the
+    current ``weights`` best predicts results (Texel tuning). Then the open
+    run weights are refitted with K fixed, so they stay in evaluate() units.
+    The five-in-a-row weight is kept: decided positions are not in the data.
+    Returns (weights, K, loss before, loss after).
+    """
+    base = np.array(weights, dtype=np.float64)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        def scores(features):
+            return (features.astype(np.float64) @ base)[:, None]
+
+        def open_runs(features):
+            return features[:, 1:].astype(np.float64)
+
+        start = 1.0 / max(1.0, float(np.abs(base[1:]).max()))
+        (k,), before = _newton(chunks, scores, [start], pool, l2=0.0)
+        u, after = _newton(chunks, open_runs, k * base[1:], pool, l2=l2)
+    fitted = [int(round(base[0]))] + [max(0, int(round(w / k))) for w in u]
+    return tuple(fitted), float(k), float(before), float(after)
+
+
+def save_weights(path, weights, **meta):
+    data = {'format': 1, 'weights': list(weights)}
+    data.update(meta)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune CaroAI evaluation weights from game archives")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_extract = sub.add_parser('extract', help='Extract pattern features from JSONL game archives')
+    p_extract.add_argument('archives', nargs='+', help='JSONL game archives')
+    p_extract.add_argument('--out', required=True, help='Directory for feature chunks')
+    p_extract.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help='Positions per chunk')
+    p_extract.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    p_extract.add_argument('--min-ply', type=int, default=4, help='Skip positions before this ply (default: 4)')
+
+    p_fit = sub.add_parser('fit', help='Fit weights on extracted features')
+    p_fit.add_argument('features', help='Directory of feature chunks')
+    p_fit.add_argument('--out', default='weights.json', help='Weights file to write (default: weights.json)')
+    p_fit.add_argument('--workers', type=int, default=None, help='Threads (default: all cores)')
+    p_fit.add_argument('--l2', type=float, default=1e-6, help='Pull towards the current weights (default: 1e-6)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'extract':
+        total = extract(args.archives, args.out, args.chunk, args.workers, args.min_ply)
+        print(f"{total} positions written to {args.out}")
+        return 0
+
+    chunks = load_chunks(args.features)
+    weights, k, before, after = fit(chunks, workers=args.workers, l2=args.l2)
+    positions = sum(len(labels) for _, labels in chunks)
+    save_weights(args.out, weights, k=k, loss_before=before, loss_after=after, positions=positions)
+    print(f"K={k:.3g} loss {before:.5f} -> {after:.5f} on {positions} positions")
+    print(f"weights: {list(weights)} -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
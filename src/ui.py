@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import threading
 from typing import Optional, Any
 
 from textual.app import App, ComposeResult
@@ -9,7 +10,17 @@ from textual.widgets import Static, DataTable, Button
 from textual.containers import Horizontal, Vertical, Container
 
 from .game import Game
-from .ai import CaroAI
+from .ai import CaroAI, evaluator_version, load_weights
+from .cache import AnalysisCache
+from .profiling import ProfileSession
+
+# Hint analysis: deepest iteration and number of candidate moves shown
+ANALYSIS_MAX_DEPTH = 8
+ANALYSIS_TOP_N = 5
+# Search progress arrives from a worker thread; it is drawn at most this often
+ANALYSIS_REFRESH_HZ = 10
+# Candidate heat map, best move first
+HEAT_COLORS = ("#15803d", "#166534", "#14532d", "#1e3a2f", "#1f2937")
 
 
 class HeaderBar(Static):
@@ -121,6 +132,7 @@ class CaroApp(App):
         ("u", "undo", "Hoàn tác"),
         ("r", "redo", "Làm lại"),
         ("n", "new", "Ván mới"),
+        ("a", "analysis", "Phân tích"),
     ]
 
     game: Game
@@ -130,11 +142,36 @@ class CaroApp(App):
     thinking: reactive[bool] = reactive(False)
     size_ok: reactive[bool] = reactive(True)
 
-    def __init__(self, size: int, win_condition: int, difficulty: str) -> None:
+    def __init__(
+        self,
+        size: int,
+        win_condition: int,
+        difficulty: str,
+        cache: Optional[AnalysisCache] = None,
+        profiler: Optional[ProfileSession] = None,
+        weights: Optional[tuple[int, ...]] = None,
+    ) -> None:
         super().__init__()
         self.game = Game(size=size, win_condition=win_condition)
-        self.ai = CaroAI(player='O', opponent='X')
+        self.ai = CaroAI(player='O', opponent='X', symmetry=True, cache=cache, weights=weights)
         self.difficulty = difficulty
+        self.profiler = profiler
+        # Hints for the human side run the same search as the AI
+        self.analyzer = CaroAI(
+            player='X', opponent='O', time_limit=float('inf'), symmetry=True, cache=cache, weights=weights
+        )
+        self.analysis_enabled = False
+        self._analysis_stop: Optional[threading.Event] = None
+        self._analysis_task: Optional[asyncio.Future] = None
+
+        # Latest search progress as (generation, info); written by the search
+        # thread, drawn by a timer on the UI thread
+        self._search_gen = 0
+        self._analysis_gen: Optional[int] = None
+        self._search_info: Optional[tuple[int, dict]] = None
+        self._search_dirty = False
+        self._heat: dict[tuple[int, int], int] = {}
+        self._last_ai_time: Optional[float] = None
 
         # UI element placeholders (initialized in compose)
         self.header = None  # type: ignore[assignment]
@@ -150,6 +187,8 @@ class CaroApp(App):
         self.row_index_by_key = {}
         self.col_index_by_key = {}
         self.label_col_key = None
+        # Last text drawn per cell, so refreshes only touch changed cells
+        self.cell_cache: dict[tuple[int, int], str] = {}
 
     def compose(self) -> ComposeResult:
         self.header = HeaderBar(
@@ -212,6 +251,7 @@ class CaroApp(App):
         # Apply responsive tweaks and show size hint if needed
         self._apply_responsive_layout()
         self._update_size_hint()
+        self.set_interval(1 / ANALYSIS_REFRESH_HZ, self._flush_search_info)
 
     def on_resize(self, event) -> None:
         # Update layout and size hint when terminal size changes
@@ -225,6 +265,7 @@ class CaroApp(App):
         self.row_index_by_key = {}
         self.col_index_by_key = {}
         self.label_col_key = None
+        self.cell_cache = {}
         # First column header blank, others 1..N
         blank_key = self.board_table.add_column(" ")
         self.col_keys.append(blank_key)
@@ -237,7 +278,9 @@ class CaroApp(App):
         for r in range(self.game.size):
             row_data = [f"[b]{r + 1}[/b]"]
             for c in range(self.game.size):
-                row_data.append(self._cell_display(r, c, show_index=False))
+                text = self._cell_display(r, c, show_index=False)
+                self.cell_cache[(r, c)] = text
+                row_data.append(text)
             row_key = self.board_table.add_row(*row_data)
             self.row_keys.append(row_key)
             self.row_index_by_key[row_key] = r
@@ -253,6 +296,9 @@ class CaroApp(App):
     def _cell_display(self, r: int, c: int, show_index: bool = True) -> str:
         cell_val = self.game.board.grid[r][c]
         content = self._cell_content(r, c, show_index=show_index)
+        if cell_val == self.game.board.EMPTY and (r, c) in self._heat:
+            rank = self._heat[(r, c)]
+            return f"[on {HEAT_COLORS[min(rank, len(HEAT_COLORS) - 1)]}][b]{rank + 1}[/b][/]"
         win_seq = self.game.get_winning_sequence()
         if win_seq and (r, c) in win_seq:
             return f"[on #fde68a bold]{content}[/]"
@@ -264,8 +310,11 @@ class CaroApp(App):
     def _refresh_board(self) -> None:
         for r, row_key in enumerate(self.row_keys):
             for c in range(self.game.size):
-                col_key = self.col_keys[c + 1]
-                self.board_table.update_cell(row_key, col_key, self._cell_display(r, c, show_index=False))
+                text = self._cell_display(r, c, show_index=False)
+                if self.cell_cache.get((r, c)) == text:
+                    continue
+                self.cell_cache[(r, c)] = text
+                self.board_table.update_cell(row_key, self.col_keys[c + 1], text)
 
     def _apply_responsive_layout(self) -> None:
         """Adjust widths based on current terminal size and center the board."""
@@ -295,14 +344,94 @@ class CaroApp(App):
         )
         if ai_time is not None:
             status += f"\n[warn]Thời gian AI: {ai_time:.1f}s[/warn]"
+        info = self._current_search_info()
+        if info is not None:
+            status += "\n\n" + self._search_text(info)
         self.status_panel.set_text(status)
 
         self.help_panel.set_text(
             "Nhấp chuột vào ô để đánh.\n"
-            "Phím tắt: U = Hoàn tác, R = Làm lại, N = Ván mới, Q = Thoát.\n"
+            "Phím tắt: U = Hoàn tác, R = Làm lại, N = Ván mới, A = Phân tích, Q = Thoát.\n"
             "Nút nhanh ở dưới cùng. Ô mờ: ô trống (giao điểm) | Ô vàng: chuỗi thắng"
+            " | Ô số: nước gợi ý (1 = tốt nhất)"
+        )
+
+    def _search_text(self, info: dict) -> str:
+        who = "AI (O)" if info['player'] == 'O' else "Gợi ý (X)"
+        depth = f"{info['depth']}" if info['complete'] else f"{info['depth']}…"
+        nps = info['nodes'] / info['elapsed'] if info['elapsed'] > 0 else 0
+        pv = " → ".join(f"{r + 1},{c + 1}" for r, c in info['pv']) or "-"
+        return (
+            f"[b]{who}[/b]  Độ sâu: {depth}\n"
+            f"Điểm: {info['score']:+,}\n"
+            f"Nút: {info['nodes']:,} ({nps:,.0f}/s)\n"
+            f"PV: {pv}"
         )
 
+    def _current_search_info(self) -> Optional[dict]:
+        snapshot = self._search_info
+        if snapshot is None or snapshot[0] != self._search_gen:
+            return None
+        return snapshot[1]
+
+    def _new_search(self) -> int:
+        # Invalidate progress from earlier searches and clear the heat map
+        self._search_gen += 1
+        self._search_info = None
+        self._search_dirty = False
+        self._heat = {}
+        return self._search_gen
+
+    def _on_search_update(self, gen: int, info: dict) -> None:
+        # Runs on the search thread: only hand the snapshot over
+        self._search_info = (gen, info)
+        self._search_dirty = True
+
+    def _flush_search_info(self) -> None:
+        if not self._search_dirty:
+            return
+        self._search_dirty = False
+        info = self._current_search_info()
+        if info is None:
+            return
+        self._heat = {}
+        # Only the hints for X are drawn; the AI's own candidates are not
+        if self.analysis_enabled and info['player'] == 'X':
+            for rank, (move, _) in enumerate(info['candidates']):
+                self._heat[move] = rank
+        self._refresh_board()
+        self._update_sidebars(ai_time=self._last_ai_time)
+
+    async def _start_analysis(self) -> None:
+        await self._stop_analysis()
+        if not self.analysis_enabled or self.thinking or self.game.finished or self.game.current_player != 'X':
+            return
+        gen = self._new_search()
+        self._analysis_gen = gen
+        stop = threading.Event()
+        self._analysis_stop = stop
+        self._analysis_task = asyncio.ensure_future(asyncio.to_thread(
+            self.analyzer.search,
+            self.game.board.copy(),
+            self.game.win_condition,
+            ANALYSIS_MAX_DEPTH,
+            ANALYSIS_TOP_N,
+            lambda info: self._on_search_update(gen, info),
+            stop,
+        ))
+
+    async def _stop_analysis(self) -> None:
+        task, stop = self._analysis_task, self._analysis_stop
+        self._analysis_task = None
+        self._analysis_stop = None
+        if stop is not None:
+            stop.set()
+        if task is not None:
+            try:
+                await task
+            except Exception:
+                pass
+
     def _update_message(self, text: str) -> None:
         self.message_panel.set_text(text)
 
@@ -327,34 +456,61 @@ class CaroApp(App):
             self.size_hint.styles.display = "block"
 
     def action_quit(self) -> None:
+        if self._analysis_stop is not None:
+            self._analysis_stop.set()
         self.exit()
 
     async def action_undo(self) -> None:
         if self.thinking or self.game.finished:
             return
+        await self._stop_analysis()
         if self.game.undo():
+            self._new_search()
             self._refresh_board()
             self._update_sidebars()
             self._update_message("[dim]Đã hoàn tác.[/dim]")
+        await self._start_analysis()
 
     async def action_redo(self) -> None:
         if self.thinking or self.game.finished:
             return
+        await self._stop_analysis()
         if self.game.redo():
+            self._new_search()
             self._refresh_board()
             self._update_sidebars()
             self._update_message("[dim]Đã làm lại.[/dim]")
         else:
             self._update_message("[warn]Không có nước để làm lại.[/warn]")
+        await self._start_analysis()
 
     async def action_new(self) -> None:
         if self.thinking:
             return
+        await self._stop_analysis()
         self.game.reset()
+        self._new_search()
+        self._last_ai_time = None
         self._refresh_board()
         self._update_sidebars()
         self._update_message("[dim]Ván mới. Lượt của bạn (X).[/dim]")
         self.set_focus(self.board_table)
+        await self._start_analysis()
+
+    async def action_analysis(self) -> None:
+        self.analysis_enabled = not self.analysis_enabled
+        if self.analysis_enabled:
+            self._update_message("[accent]Phân tích: bật. Ô số là nước gợi ý.[/accent]")
+            await self._start_analysis()
+        else:
+            await self._stop_analysis()
+            # Drop the hints, but keep the progress of an AI search
+            if self._search_gen == self._analysis_gen:
+                self._new_search()
+            self._heat = {}
+            self._refresh_board()
+            self._update_sidebars(ai_time=self._last_ai_time)
+            self._update_message("[dim]Phân tích: tắt.[/dim]")
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         bid = event.button.id or ""
@@ -374,6 +530,9 @@ class CaroApp(App):
             if not self.game.make_move(row, col):
                 self._update_message("[warn]Nước đi không hợp lệ, hãy thử lại![/warn]")
                 return
+            await self._stop_analysis()
+            self._new_search()
+            self._last_ai_time = None
             self._refresh_board()
             self._update_sidebars()
             if self._maybe_finish():
@@ -402,16 +561,25 @@ class CaroApp(App):
             self._update_sidebars()
             loop = asyncio.get_event_loop()
             t0 = loop.time()
+            # Search a copy so progress redraws never show the search's stones
+            gen = self._new_search()
+            args = (self.ai.get_move, self.game.board.copy(), self.game.win_condition, self.difficulty)
+            if self.profiler is not None:
+                # Worker threads are invisible to cProfile before Python 3.12
+                args = (self.profiler.call, *args)
             row, col = await asyncio.to_thread(
-                self.ai.get_move, self.game.board, self.game.win_condition, self.difficulty
+                *args, on_update=lambda info: self._on_search_update(gen, info)
             )
             t1 = loop.time()
             self.game.make_move(row, col)
+            self._last_ai_time = t1 - t0
+            self._flush_search_info()
             self._refresh_board()
             self._update_sidebars(ai_time=(t1 - t0))
             self.thinking = False
             if not self._maybe_finish():
                 self.set_focus(self.board_table)
+                await self._start_analysis()
         except Exception as e:
             self.thinking = False
             self._update_message(f"[bad]Lỗi AI: {type(e).__name__}: {e}[/bad]")
@@ -469,6 +637,30 @@ class CaroApp(App):
             self._update_message(f"[bad]Lỗi khi chọn ô: {type(e).__name__}: {e}[/bad]")
 
 
-def run_textual_app(size: int, win_condition: int, difficulty: str) -> None:
-    app = CaroApp(size=size, win_condition=win_condition, difficulty=difficulty)
-    app.run()
+def run_textual_app(
+    size: int,
+    win_condition: int,
+    difficulty: str,
+    cache_path: Optional[str] = None,
+    profiler: Optional[ProfileSession] = None,
+    weights_path: Optional[str] = None,
+) -> None:
+    weights = load_weights(weights_path)
+    cache = AnalysisCache(cache_path, evaluator_version=evaluator_version(weights)) if cache_path else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        app = CaroApp(
+            size=size,
+            win_condition=win_condition,
+            difficulty=difficulty,
+            cache=cache,
+            profiler=profiler,
+            weights=weights,
+        )
+        app.run()
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        if cache is not None:
+            cache.close()
@@ -0,0 +1,72 @@
+# Root move choice when the search runs out of time
+import random
+
+import pytest
+
+from src.ai import CaroAI, DEFAULT_WEIGHTS
+from src.board import Board
+
+
+def crowded_board(size, four, blocker, player, seed):
+    # ``player`` has four in a row at ``four``, blocked on the left, with the
+    # fifth cell open; the rest of the board is scattered stones
+    board = Board(size)
+    board.make_move(*blocker, 'O' if player == 'X' else 'X')
+    for cell in four:
+        board.make_move(*cell, player)
+    expected = threats(board, 'X') | threats(board, 'O')
+    rng = random.Random(seed)
+    placed = 0
+    while placed < size * 2:
+        row, col = rng.randrange(size), rng.randrange(size)
+        stone = 'XO'[placed % 2]
+        if abs(row - four[0][0]) <= 1 or not board.make_move(row, col, stone):
+            continue
+        if threats(board, 'X') | threats(board, 'O') != expected:
+            board.undo_move(row, col)
+            continue
+        placed += 1
+    return board
+
+
+def threats(board, player):
+    found = set()
+    for move in board.get_valid_moves():
+        board.make_move(*move, player)
+        if board.check_win(player):
+            found.add(move)
+        board.undo_move(*move)
+    return found
+
+
+@pytest.mark.parametrize("size,depth", [(15, 2), (19, 4)])
+def test_timed_out_search_plays_win_in_one(size, depth):
+    four = [(2, 1), (2, 2), (2, 3), (2, 4)]
+    board = crowded_board(size, four, (2, 0), 'O', seed=size)
+    ai = CaroAI(player='O', opponent='X', time_limit=0, weights=DEFAULT_WEIGHTS)
+    # The win must not be the first root move, or any search would find it
+    assert ai.smart_moves(board).index((2, 5)) > 0
+    result = ai.search(board, 5, depth, start_depth=depth)
+    assert not result['complete']
+    assert result['move'] == (2, 5)
+    assert result['score'] == 100000
+
+
+@pytest.mark.parametrize("size,depth", [(15, 2), (19, 4)])
+def test_timed_out_search_blocks_win_in_one(size, depth):
+    four = [(3, 1), (3, 2), (3, 3), (3, 4)]
+    board = crowded_board(size, four, (3, 0), 'X', seed=size)
+    ai = CaroAI(player='O', opponent='X', time_limit=0, weights=DEFAULT_WEIGHTS)
+    assert ai.smart_moves(board).index((3, 5)) > 0
+    result = ai.search(board, 5, depth, start_depth=depth)
+    assert result['move'] == (3, 5)
+    assert all(score == -100000 for _, score in result['candidates'][1:])
+
+
+def test_timed_out_search_keeps_board_intact():
+    board = crowded_board(15, [(2, 1), (2, 2), (2, 3), (2, 4)], (2, 0), 'O', seed=1)
+    grid = [row[:] for row in board.grid]
+    hashes = board.hashes
+    CaroAI(player='O', opponent='X', time_limit=0, weights=DEFAULT_WEIGHTS).search(board, 5, 2, start_depth=2)
+    assert board.grid == grid
+    assert board.hashes == hashes
@@ -0,0 +1,115 @@
+# On-disk format of the persistent analysis cache
+import os
+
+import pytest
+
+from src.cache import (BUCKET_SIZE, ENTRY, EXACT, HEADER_SIZE, LOWER, UPPER, AnalysisCache,
+                       _pack, _unpack)
+
+SMALL = HEADER_SIZE + 64 * BUCKET_SIZE
+
+
+@pytest.mark.parametrize("depth,score,bound,move", [
+    (0, 0, EXACT, (0, 0)),
+    (4, -100000, UPPER, None),
+    (255, 100000, LOWER, (18, 7)),
+    (2, -1, EXACT, (254, 254)),
+    (1, -0x7FFFFFFF, LOWER, None),
+])
+def test_pack_round_trip(depth, score, bound, move):
+    assert _unpack(_pack(depth, score, bound, move)) == (depth, score, bound, move)
+
+
+def test_pack_clamps_score():
+    assert _unpack(_pack(1, 1 << 40, EXACT, None))[1] == 0x7FFFFFFF
+    assert _unpack(_pack(1, -(1 << 40), EXACT, None))[1] == -0x7FFFFFFF
+
+
+def test_store_and_probe(tmp_path):
+    path = str(tmp_path / "tt.bin")
+    with AnalysisCache(path, max_bytes=SMALL) as cache:
+        assert cache.probe(12345) is None
+        cache.store(12345, 3, -250, UPPER, None)
+        cache.store(67890, 2, 40, EXACT, (4, 5))
+        assert cache.probe(12345) == (3, -250, UPPER, None)
+    with AnalysisCache(path, max_bytes=SMALL) as cache:
+        assert cache.probe(67890) == (2, 40, EXACT, (4, 5))
+    assert os.path.getsize(path) == SMALL
+
+
+def test_bucket_keeps_deepest_and_newest(tmp_path):
+    with AnalysisCache(str(tmp_path / "tt.bin"), max_bytes=HEADER_SIZE + BUCKET_SIZE) as cache:
+        cache.store(1, 5, 10, EXACT, (1, 1))
+        cache.store(2, 2, 20, EXACT, (2, 2))
+        cache.store(3, 3, 30, EXACT, (3, 3))
+        assert cache.probe(1) == (5, 10, EXACT, (1, 1))
+        assert cache.probe(2) is None
+        assert cache.probe(3) == (3, 30, EXACT, (3, 3))
+        # A deeper result takes the first slot and demotes the old one
+        cache.store(4, 6, 40, EXACT, (4, 4))
+        assert cache.probe(4) == (6, 40, EXACT, (4, 4))
+        assert cache.probe(1) == (5, 10, EXACT, (1, 1))
+        assert cache.probe(3) is None
+
+
+def test_torn_write_reads_as_miss(tmp_path):
+    with AnalysisCache(str(tmp_path / "tt.bin"), max_bytes=HEADER_SIZE + BUCKET_SIZE) as cache:
+        cache.store(77, 4, 500, EXACT, (6, 6))
+        check, data = ENTRY.unpack_from(cache._mm, HEADER_SIZE)
+        # Data word from another writer landing next to this entry's check word
+        ENTRY.pack_into(cache._mm, HEADER_SIZE, check, _pack(4, 501, EXACT, (6, 6)))
+        assert cache.probe(77) is None
+
+
+def test_evaluator_version_change_wipes_entries(tmp_path):
+    path = str(tmp_path / "tt.bin")
+    with AnalysisCache(path, evaluator_version=1, max_bytes=SMALL) as cache:
+        cache.store(42, 3, 7, EXACT, (1, 2))
+    with AnalysisCache(path, evaluator_version=2, max_bytes=2 * SMALL) as cache:
+        assert cache.probe(42) is None
+        cache.store(42, 1, 8, EXACT, (2, 1))
+    # The file keeps its size; the old version's entries are gone too
+    assert os.path.getsize(path) == SMALL
+    with AnalysisCache(path, evaluator_version=1, max_bytes=SMALL) as cache:
+        assert cache.probe(42) is None
+
+
+def test_other_process_reset_is_seen(tmp_path):
+    path = str(tmp_path / "tt.bin")
+    with AnalysisCache(path, evaluator_version=1, max_bytes=SMALL) as old:
+        old.store(42, 3, 7, EXACT, (1, 2))
+        with AnalysisCache(path, evaluator_version=2, max_bytes=SMALL):
+            pass
+        assert old.probe(42) is None
+        old.store(43, 3, 7, EXACT, (1, 2))
+        assert old.probe(43) is None
+
+
+def test_non_cache_file_is_left_alone(tmp_path):
+    path = tmp_path / "notes.txt"
+    text = b"do not overwrite me\n" * 10
+    path.write_bytes(text)
+    with pytest.raises(ValueError):
+        AnalysisCache(str(path), max_bytes=SMALL)
+    assert path.read_bytes() == text
+
+
+@pytest.mark.parametrize("keep", [8, HEADER_SIZE, HEADER_SIZE + 5 * BUCKET_SIZE])
+def test_truncated_cache_is_recreated(tmp_path, keep):
+    path = str(tmp_path / "tt.bin")
+    with AnalysisCache(path, max_bytes=SMALL) as cache:
+        cache.store(42, 3, 7, EXACT, (1, 2))
+    os.truncate(path, keep)
+    with AnalysisCache(path, max_bytes=SMALL) as cache:
+        assert cache.probe(42) is None
+        cache.store(42, 1, 8, EXACT, (2, 1))
+        assert cache.probe(42) == (1, 8, EXACT, (2, 1))
+    assert os.path.getsize(path) == SMALL
+
+
+def test_empty_file_becomes_cache(tmp_path):
+    path = tmp_path / "tt.bin"
+    path.write_bytes(b"")
+    with AnalysisCache(str(path), max_bytes=SMALL) as cache:
+        cache.store(5, 1, 1, EXACT, None)
+        assert cache.probe(5) == (1, 1, EXACT, None)
@@ -0,0 +1,93 @@
+# Canonical keys must be shared by all 8 orientations of a position, and
+# moves stored in canonical orientation must map back onto any of them
+import random
+
+import pytest
+
+from src.board import Board
+from src.symmetry import INVERSE, SYMMETRY_COUNT, from_canonical, to_canonical, transform
+
+
+def random_board(size, stones, rng):
+    board = Board(size)
+    while stones:
+        row, col = rng.randrange(size), rng.randrange(size)
+        if board.make_move(row, col, 'XO'[stones % 2]):
+            stones -= 1
+    return board
+
+
+def transformed(board, sym):
+    other = Board(board.size, board.win_condition)
+    for row in range(board.size):
+        for col in range(board.size):
+            if board.grid[row][col] != board.EMPTY:
+                other.make_move(*transform(row, col, sym, board.size), board.grid[row][col])
+    return other
+
+
+def test_inverse_undoes_transform():
+    for sym in range(SYMMETRY_COUNT):
+        for row in range(7):
+            for col in range(7):
+                moved = transform(row, col, sym, 7)
+                assert transform(*moved, INVERSE[sym], 7) == (row, col)
+
+
+@pytest.mark.parametrize("size", [6, 10, 15, 19])
+def test_symmetric_positions_share_canonical_key(size):
+    rng = random.Random(size)
+    for _ in range(20):
+        board = random_board(size, rng.randint(1, size * 2), rng)
+        key, _ = board.canonical_key()
+        for sym in range(SYMMETRY_COUNT):
+            assert transformed(board, sym).canonical_key()[0] == key
+
+
+@pytest.mark.parametrize("size", [6, 10, 15, 19])
+def test_canonical_move_maps_onto_transformed_board(size):
+    rng = random.Random(size)
+    for _ in range(20):
+        # Enough stones that the position has no symmetry of its own
+        board = random_board(size, size, rng)
+        _, sym0 = board.canonical_key()
+        move = rng.choice(board.get_valid_moves())
+        stored = to_canonical(move, sym0, size)
+        for sym in range(SYMMETRY_COUNT):
+            other = transformed(board, sym)
+            _, other_sym = other.canonical_key()
+            assert from_canonical(stored, other_sym, size) == transform(*move, sym, size)
+    assert to_canonical(None, 3, size) is None
+    assert from_canonical(None, 3, size) is None
+
+
+def test_undo_restores_hashes():
+    rng = random.Random(0)
+    board = random_board(15, 20, rng)
+    before = board.hashes
+    moves = []
+    for _ in range(10):
+        move = rng.choice(board.get_valid_moves())
+        board.make_move(*move, rng.choice('XO'))
+        moves.append(move)
+    assert board.hashes != before
+    for move in reversed(moves):
+        board.undo_move(*move)
+    assert board.hashes == before
+    # Undoing an empty cell is a no-op for the hashes
+    board.undo_move(*moves[0])
+    assert board.hashes == before
+
+
+def test_hashes_depend_only_on_position():
+    rng = random.Random(1)
+    board = random_board(10, 15, rng)
+    stones = [(r, c, board.grid[r][c]) for r in range(10) for c in range(10) if board.grid[r][c] != board.EMPTY]
+    rng.shuffle(stones)
+    other = Board(10)
+    for row, col, player in stones:
+        other.make_move(row, col, player)
+    assert other.hashes == board.hashes
+    assert board.copy().canonical_key() == board.canonical_key()
+    board.reset()
+    assert board.hashes == Board(10).hashes == [0] * SYMMETRY_COUNT
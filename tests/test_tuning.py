@@ -0,0 +1,35 @@
+# The tuner's vectorized pattern counts must reproduce CaroAI.evaluate exactly
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.ai import CaroAI, DEFAULT_WEIGHTS
+from src.board import Board
+from src.tuning import O, X, pattern_counts
+
+
+def random_positions(size, win_condition, count, rng):
+    boards, grids = [], []
+    for _ in range(count):
+        board = Board(size, win_condition)
+        grid = np.zeros((size, size), dtype=np.int8)
+        for _ in range(rng.randint(0, size * size * 2 // 3)):
+            row, col = rng.randrange(size), rng.randrange(size)
+            player = rng.choice('XO')
+            if board.make_move(row, col, player):
+                grid[row, col] = X if player == 'X' else O
+        boards.append(board)
+        grids.append(grid)
+    return boards, np.stack(grids)
+
+
+@pytest.mark.parametrize("size,win_condition", [(6, 3), (10, 5), (15, 5), (19, 5), (8, 4), (12, 6)])
+def test_pattern_counts_match_evaluate(size, win_condition):
+    rng = random.Random(f"{size}:{win_condition}")
+    boards, grids = random_positions(size, win_condition, 40, rng)
+    ai = CaroAI(player='O', opponent='X', weights=DEFAULT_WEIGHTS)
+    expected = [ai.evaluate(board, win_condition) for board in boards]
+    counts = pattern_counts(grids, O, win_condition) - pattern_counts(grids, X, win_condition)
+    assert (counts @ np.array(DEFAULT_WEIGHTS)).tolist() == expected